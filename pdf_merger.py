@@ -14,68 +14,748 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
 from tkinterdnd2 import DND_FILES, TkinterDnD
-import fitz  # PyMuPDF
-from PIL import Image, ImageTk
+from PIL import Image, ImageTk, ImageDraw, ImageFont
 import os
+import sys
+import stat
+import io
 import json
 import shutil
-import zipfile
-import xml.etree.ElementTree as ET
+import gc
+import hashlib
 import tempfile
+import threading
+import importlib
+import queue
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from collections import OrderedDict
+from array import array
+# PyMuPDF (fitz), zipfile and xml.etree are imported where first used, so the
+# window comes up without waiting for them. The optional speedups below are
+# loaded the same way, through _optional():
+#   pypdfium2            much faster thumbnail rasterization
+#   msgpack + zstandard  compact binary project files
+#   orjson               faster JSON projects
+#   numpy                simplifies pen strokes when they are finished
+_optional_modules = {}
+
+def _optional(name):
+    """Import an optional module on first use, returning None if it is not installed"""
+    try:
+        return _optional_modules[name]
+    except KeyError:
+        pass
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        module = None
+    _optional_modules[name] = module
+    return module
 
 # Set appearance and color theme
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
-class PageThumbnail(ctk.CTkFrame):
-    def __init__(self, master, file_path, page_index, thumbnail_img, on_click, on_drag_start, **kwargs):
-        super().__init__(master, **kwargs)
+# PyMuPDF is not thread-safe, so thread workers render one page at a time and
+# only overlap disk cache reads. Set this to True (or PDFMERGER_PROCESS_POOL=1) to
+# render in worker processes instead, which rasterize in parallel; rendering
+# falls back to threads if the process pool cannot start.
+USE_PROCESS_POOL = os.environ.get("PDFMERGER_PROCESS_POOL") == "1"
+
+# Pages per render task, so one large file is split across several workers
+THUMB_BATCH_SIZE = 16
+
+# How often the UI thread collects finished render batches while any are pending
+THUMB_POLL_MS = 30
+
+# How often the UI thread picks up export progress while an export runs
+EXPORT_POLL_MS = 100
+
+# PDFium is not thread-safe. Thread workers take turns; each worker process has its own lock.
+_PDFIUM_LOCK = threading.Lock()
+
+# MuPDF shares one global context between threads, so every PyMuPDF call
+# (render workers, previews, export) holds this lock
+_MUPDF_LOCK = threading.RLock()
+
+# Documents each render worker keeps open between batches
+WORKER_OPEN_DOCS = 4
+_worker_state = threading.local()
+_worker_doc_caches = [] # Every thread's _WorkerDocs, so the UI thread can release them
+
+# Thumbnail bounding box in pixels (width, height)
+THUMB_SIZE = (80, 110)
+
+# Page list layout on the thumbnail canvas, in pixels
+ROW_HEIGHT = THUMB_SIZE[1] + 10
+ROW_WIDTH = 360
+THUMB_BG = "gray17" # Matches the dark CTkFrame color
+PREFETCH_SCREENS = 2 # Render thumbnails this many screens above/below the viewport
+CULL_SCREENS = 6 # Rows further off-screen than this drop their image
+
+# Pen strokes, in preview canvas pixels: motion closer than MIN_STEP to the last point
+# is skipped, and finished strokes are simplified to within TOLERANCE
+STROKE_MIN_STEP_PX = 2
+STROKE_TOLERANCE_PX = 0.5
+
+# Delay before typed note text is stored, so bursts of keystrokes coalesce
+NOTE_DEBOUNCE_MS = 200
+
+# Maximum number of PDFs kept open by PDFMergerApp._get_doc
+MAX_OPEN_DOCS = 16
+
+# Maximum number of page previews kept in memory
+MAX_PREVIEWS = 32
+
+# Decoded thumbnails kept in memory beyond these are evicted, least recently used first
+MAX_THUMB_CACHE_BYTES = 64 * 1024 * 1024
+MAX_THUMBNAILS = 512
+
+# Page selections between trims of MuPDF's internal object store
+STORE_SHRINK_INTERVAL = 50
+
+# Rendered thumbnails/previews persist here across sessions
+THUMB_CACHE_DIR = Path.home() / ".cache" / "pdfmerger" / "thumbs"
+THUMB_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Bytes hashed from each end of a file for its cache fingerprint
+FINGERPRINT_BYTES = 64 * 1024
+_fingerprints = {} # (abspath, mtime_ns) -> fingerprint, so a file is hashed once per change
+
+def _file_fingerprint(file_path, mtime_ns=None):
+    """Content fingerprint of a file, or None if it can't be read
+
+    Hashes the size and the first and last FINGERPRINT_BYTES rather than the
+    path or mtime, so a moved, copied or re-extracted PDF (forScore setlists are
+    unpacked to a new temp dir each time) still hits the cache.
+    """
+    path = os.path.abspath(file_path)
+    if mtime_ns is None:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    fingerprint = _fingerprints.get((path, mtime_ns))
+    if fingerprint is None:
+        h = hashlib.sha1()
+        try:
+            with open(path, 'rb') as f:
+                h.update(f.read(FINGERPRINT_BYTES))
+                size = f.seek(0, os.SEEK_END)
+                if size > FINGERPRINT_BYTES:
+                    # PDF edits rewrite or append to the trailer at the end
+                    f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+                    h.update(f.read())
+        except OSError:
+            return None
+        h.update(str(size).encode())
+        fingerprint = _fingerprints[(path, mtime_ns)] = h.hexdigest()
+    return fingerprint
+
+def _thumb_cache_path(file_path, page_idx, size, ext="webp", mtime_ns=None):
+    """Disk cache location for a rendered page, or None if the file is gone
+
+    Pass mtime_ns when the caller already has it, to skip the stat call.
+    """
+    fingerprint = _file_fingerprint(file_path, mtime_ns)
+    if fingerprint is None:
+        return None
+    return THUMB_CACHE_DIR / f"{fingerprint}_{page_idx}_{size[0]}x{size[1]}.{ext}"
+
+def _load_cached_image(cache_path):
+    if cache_path is None:
+        return None
+    try:
+        img = Image.open(cache_path)
+        img.load() # Decodes and closes the file
+    except Exception:
+        return None
+    # WebP decodes straight to RGB; convert() would only add a full copy
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+def _write_cache_file(cache_path, write):
+    """Call write(f) on a temp file and move it into place, so a crash or full
+    disk never leaves a truncated cache file behind"""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _save_cached_data(data, cache_path):
+    if cache_path is None:
+        return
+    try:
+        _write_cache_file(cache_path, lambda f: f.write(data))
+    except OSError:
+        pass # Caching is best effort
+
+def _save_cached_image(img, cache_path):
+    if cache_path is None:
+        return
+    try:
+        _write_cache_file(cache_path, lambda f: img.save(f, "WEBP", quality=80))
+    except Exception:
+        pass # Caching is best effort
+
+def _prune_thumb_cache(max_bytes=THUMB_CACHE_MAX_BYTES):
+    """Evict least recently accessed cache files until under max_bytes"""
+    entries = []
+    try:
+        for entry in THUMB_CACHE_DIR.glob("*.*"):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue # Removed mid-scan, e.g. by another instance pruning
+            entries.append((st.st_atime, st.st_size, entry))
+    except OSError:
+        return # Cache directory unreadable
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+        except FileNotFoundError:
+            pass # Already gone, which frees the space just the same
+        except OSError:
+            continue
+        total -= size
+
+_annotation_font = None
+
+def _get_annotation_font():
+    """Bold 14px font for text annotations, loaded once"""
+    global _annotation_font
+    if _annotation_font is None:
+        for name in ("arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf"):
+            try:
+                _annotation_font = ImageFont.truetype(name, 14)
+                break
+            except OSError:
+                pass
+        else:
+            try:
+                _annotation_font = ImageFont.load_default(size=14) # Pillow >= 10.1
+            except TypeError:
+                _annotation_font = ImageFont.load_default()
+    return _annotation_font
+
+def _draw_annotations(img, annotations, zoom):
+    """Rasterize annotations (in PDF coordinates) onto a preview rendered at zoom"""
+    draw = ImageDraw.Draw(img)
+    for ann in annotations:
+        if ann['type'] == 'pen':
+            if len(ann['points']) < 2:
+                continue
+            np = _optional("numpy")
+            if np is not None:
+                # Scale the whole stroke at once; ImageDraw takes a flat coordinate list
+                points = (np.asarray(ann['points'], np.float32) * zoom).ravel().tolist()
+            else:
+                points = [(x * zoom, y * zoom) for x, y in ann['points']]
+            draw.line(points, fill="blue", width=2, joint="curve")
+        elif ann['type'] == 'text':
+            x, y = ann['pos']
+            font = _get_annotation_font()
+            # Centered on the click like the canvas text was; bitmap fonts can't anchor
+            anchor = "mm" if isinstance(font, ImageFont.FreeTypeFont) else None
+            draw.text((x * zoom, y * zoom), ann['content'], fill="red", font=font, anchor=anchor)
+
+def _simplify_stroke(points, epsilon):
+    """Drop stroke points within epsilon of the simplified line (Ramer-Douglas-Peucker)
+
+    points may be an (N, 2) array; the result is always a list of (x, y) tuples.
+    Returns points unchanged when NumPy is not installed.
+    """
+    np = _optional("numpy")
+    if np is None:
+        return points
+    pts = np.asarray(points, dtype=float)
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, len(pts) - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        start = pts[first]
+        seg = pts[last] - start
+        inner = pts[first + 1:last] - start
+        seg_len = np.hypot(seg[0], seg[1])
+        if seg_len == 0: # Closed loop: measure from the shared end point
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(seg[0] * inner[:, 1] - seg[1] * inner[:, 0]) / seg_len
+        farthest = int(np.argmax(dist))
+        if dist[farthest] > epsilon:
+            mid = first + 1 + farthest
+            keep[mid] = True
+            spans.append((first, mid))
+            spans.append((mid, last))
+    return [tuple(p) for p in pts[keep].tolist()]
+
+class StrokeBuffer:
+    """Points of the pen stroke being drawn, in PDF coordinates
+
+    With NumPy the points fill a float32 array that doubles when full, so a
+    long stroke costs 8 bytes per point instead of a tuple each.
+    """
+    def __init__(self):
+        self._np = np = _optional("numpy")
+        self._points = np.empty((64, 2), np.float32) if np is not None else []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, x, y):
+        if self._np is None:
+            self._points.append((x, y))
+        else:
+            if self._count == len(self._points):
+                grown = self._np.empty((2 * self._count, 2), self._np.float32)
+                grown[:self._count] = self._points
+                self._points = grown
+            self._points[self._count] = (x, y)
+        self._count += 1
+
+    def points(self):
+        """The stroke as an (N, 2) array, or a list of tuples without NumPy"""
+        return self._points[:self._count] if self._np is not None else self._points
+
+def _rgb_image(width, height, buffer):
+    """Wrap packed RGB pixels in a PIL image without copying them
+
+    The image shares memory with buffer, so buffer (or the Pixmap behind a
+    samples_mv memoryview) must outlive every use of the image.
+    """
+    return Image.frombuffer("RGB", (width, height), buffer, "raw", "RGB", 0, 1)
+
+# Thumbnails are handed to tk.PhotoImage(data=...) as PPM (fresh renders) or PNG
+# (disk cache); Tk decodes both natively, so PIL stays out of the thumbnail path.
+
+def _photo_bytes(photo):
+    # Tk keeps photo images as 32-bit RGBA
+    return photo.width() * photo.height() * 4
+
+def _read_cached_data(cache_path):
+    """PNG thumbnail bytes from the disk cache, or None"""
+    if cache_path is None:
+        return None
+    try:
+        return cache_path.read_bytes()
+    except OSError:
+        return None
+
+def _thumbnail_zoom(width, height):
+    # Render straight at display size so the image never needs resampling
+    return min(THUMB_SIZE[0] / width, THUMB_SIZE[1] / height)
+
+def _pdfium_thumbnail_data(pdf, page_idx, cache_path):
+    """Rasterize a page thumbnail with PDFium, returning binary PPM"""
+    with _PDFIUM_LOCK:
+        page = pdf[page_idx]
+        try:
+            zoom = _thumbnail_zoom(*page.get_size())
+            img = page.render(scale=zoom).to_pil().convert("RGB")
+        finally:
+            page.close()
+    png, ppm = io.BytesIO(), io.BytesIO()
+    img.save(png, "PNG")
+    img.save(ppm, "PPM")
+    _save_cached_data(png.getvalue(), cache_path)
+    return ppm.getvalue()
+
+def _thumbnail_data(doc, page_idx, cache_path, matrices=None):
+    """Rasterize a page thumbnail, returning binary PPM
+
+    matrices maps page sizes to their render Matrix. Passing the same dict for
+    every page of a batch builds the Matrix once for all equally sized pages.
+    """
+    import fitz
+    with _MUPDF_LOCK:
+        page = doc[page_idx] # A temporary, dropped before the next page renders
+        rect = page.rect
+        size = (rect.width, rect.height)
+        matrix = matrices.get(size) if matrices is not None else None
+        if matrix is None:
+            zoom = _thumbnail_zoom(*size)
+            matrix = fitz.Matrix(zoom, zoom)
+            if matrices is not None:
+                matrices[size] = matrix
+        pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB, alpha=False)
+        png = pix.tobytes("png")
+        ppm = pix.tobytes("ppm")
+        page = pix = None
+    _save_cached_data(png, cache_path)
+    return ppm
+
+def _shrink_mupdf_store():
+    """Empty MuPDF's object cache, if PyMuPDF has been loaded at all"""
+    fitz = sys.modules.get("fitz")
+    if fitz is not None:
+        with _MUPDF_LOCK:
+            fitz.TOOLS.store_shrink(100)
+
+def _close_worker_doc(doc):
+    if _optional("pypdfium2") is not None:
+        with _PDFIUM_LOCK:
+            doc.close()
+    else:
+        with _MUPDF_LOCK:
+            doc.close()
+
+class _WorkerDocs:
+    """Documents one render worker thread keeps open between batches"""
+    def __init__(self):
+        self.lock = threading.Lock() # Held while the worker renders from them
+        self.docs = OrderedDict() # (path, mtime_ns) -> document, least recently used first
+        self.stale = False # Close them once the running batch is done
+
+    def close_all(self):
+        while self.docs:
+            _, doc = self.docs.popitem()
+            _close_worker_doc(doc)
+        self.stale = False
+
+def _worker_docs():
+    """Return the calling thread's _WorkerDocs, creating it on first use"""
+    cache = getattr(_worker_state, "docs", None)
+    if cache is None:
+        cache = _worker_state.docs = _WorkerDocs()
+        _worker_doc_caches.append(cache)
+    return cache
+
+def _open_worker_doc(docs, file_path, mtime_ns):
+    """Open file_path from the worker's docs, reusing its handle from earlier batches
+
+    Every worker thread has its own small LRU of documents, so a handle is
+    never shared across threads and a large PDF is not reopened for each batch.
+    """
+    key = (file_path, mtime_ns) # A changed file gets a fresh handle
+    doc = docs.get(key)
+    if doc is not None:
+        docs.move_to_end(key)
+        return doc
+    pdfium = _optional("pypdfium2")
+    if pdfium is not None:
+        with _PDFIUM_LOCK:
+            doc = pdfium.PdfDocument(file_path)
+    else:
+        import fitz
+        with _MUPDF_LOCK:
+            doc = fitz.open(file_path)
+    docs[key] = doc
+    while len(docs) > WORKER_OPEN_DOCS:
+        _, old_doc = docs.popitem(last=False)
+        _close_worker_doc(old_doc)
+    return doc
+
+def _close_worker_docs():
+    """Close the documents of all worker threads in this process
+
+    Idle workers' documents are closed right away; a worker in the middle of
+    a batch closes its own when the batch is done.
+    """
+    for cache in list(_worker_doc_caches):
+        cache.stale = True
+        if cache.lock.acquire(blocking=False):
+            try:
+                cache.close_all()
+            finally:
+                cache.lock.release()
+
+def _render_file_thumbnails(file_path, page_indices, mtime_ns=None):
+    """Render thumbnails for pages of one PDF (runs in a worker thread/process)
+
+    Returns {(file_path, page_index): ppm_or_png_bytes}. Pages that
+    fail to render are left out. The worker's cached handle serves all pages and
+    at most one pixmap is alive at a time, which keeps peak memory flat on big PDFs.
+    """
+    if mtime_ns is None:
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return {}
+    cache_paths = {i: _thumb_cache_path(file_path, i, THUMB_SIZE, "png", mtime_ns) for i in page_indices}
+
+    rendered = {}
+    to_render = []
+    for i in page_indices:
+        data = _read_cached_data(cache_paths[i])
+        if data:
+            rendered[(file_path, i)] = data
+        else:
+            to_render.append(i)
+    if not to_render:
+        return rendered
+
+    cache = _worker_docs()
+    with cache.lock:
+        if cache.stale:
+            cache.close_all() # Released while this worker was busy
+        try:
+            doc = _open_worker_doc(cache.docs, file_path, mtime_ns)
+        except Exception:
+            return rendered
+        if _optional("pypdfium2") is not None:
+            render_page = lambda i: _pdfium_thumbnail_data(doc, i, cache_paths[i])
+        else:
+            matrices = {} # Shared by the batch: most PDFs have a single page size
+            render_page = lambda i: _thumbnail_data(doc, i, cache_paths[i], matrices)
+        for i in to_render:
+            try:
+                rendered[(file_path, i)] = render_page(i)
+            except Exception:
+                pass
+        if cache.stale:
+            cache.close_all()
+    return rendered
+
+class PageList:
+    """Pages in merge order, stored as parallel arrays with one slot per page
+
+    files[i]/indices[i] name the source page; notes, marked and annotations
+    hold the edits made to it.
+    """
+    def __init__(self):
+        self.files = [] # Source PDF path
+        self.indices = array('I') # Page index within the source PDF
+        self.notes = []
+        self.marked = bytearray() # 1 if the page is marked
+        self.annotations = [] # Lists of {'type': 'pen', 'points': []} or {'type': 'text', 'pos': (x,y), 'content': ''}
+
+    def __len__(self):
+        return len(self.files)
+
+    def _columns(self):
+        return (self.files, self.indices, self.notes, self.marked, self.annotations)
+
+    def append(self, file_path, index, note='', marked=False, annotations=None):
+        self.files.append(file_path)
+        self.indices.append(index)
+        self.notes.append(note)
+        self.marked.append(1 if marked else 0)
+        self.annotations.append(annotations if annotations is not None else [])
+
+    def key(self, i):
+        return (self.files[i], self.indices[i])
+
+    def move(self, old, new):
+        for column in self._columns():
+            column.insert(new, column.pop(old))
+
+    def swap(self, a, b):
+        for column in self._columns():
+            column[a], column[b] = column[b], column[a]
+
+    def clear(self):
+        for column in self._columns():
+            del column[:]
+
+    def copy(self):
+        """Snapshot whose annotation lists can't change under a reader"""
+        pages = PageList()
+        pages.files = list(self.files)
+        pages.indices = array('I', self.indices)
+        pages.notes = list(self.notes)
+        pages.marked = bytearray(self.marked)
+        pages.annotations = [list(anns) for anns in self.annotations]
+        return pages
+
+    def runs(self):
+        """Group consecutive pages of the same file into [file, first, last] runs"""
+        runs = []
+        for file_path, index in zip(self.files, self.indices):
+            if runs and runs[-1][0] == file_path and runs[-1][2] + 1 == index:
+                runs[-1][2] = index
+            else:
+                runs.append([file_path, index, index])
+        return runs
+
+def _apply_annotations(page, annotations):
+    """Burn pen strokes and text annotations into a PDF page"""
+    ink_list = []
+    # page.insert_text would append a content stream per call; one Shape writes them all at once
+    shape = None
+    for ann in annotations:
+        if ann['type'] == 'pen':
+            ink_list.append(ann['points'])
+        elif ann['type'] == 'text':
+            if shape is None:
+                shape = page.new_shape()
+            shape.insert_text(ann['pos'], ann['content'], color=(1, 0, 0), fontsize=14)
+    if shape is not None:
+        shape.commit()
+    
+    if ink_list:
+        page.add_ink_annot(ink_list)
+
+# Name of the JSON entry inside a zipped .pmproj
+PROJECT_ENTRY = "project.json"
+
+# Leading bytes of a MessagePack + Zstandard .pmproj
+PROJECT_MAGIC = b"PMP1"
+
+def _encode_project(pdf_files, page_order):
+    """Compact project form: file paths are stored once and referenced by index"""
+    files = list(pdf_files)
+    file_ids = {path: i for i, path in enumerate(files)}
+    pages = []
+    for i, file_path in enumerate(page_order.files):
+        file_id = file_ids.get(file_path)
+        if file_id is None:
+            file_id = file_ids[file_path] = len(files)
+            files.append(file_path)
+        pages.append([file_id, page_order.indices[i], page_order.notes[i], bool(page_order.marked[i]),
+                      page_order.annotations[i]])
+    return {'version': 2, 'files': files, 'pages': pages}
+
+def _decode_project(data):
+    """Return (pdf_files, page_order) from compact or legacy project data"""
+    page_order = PageList()
+    if 'pages' not in data:
+        # Legacy plain JSON projects stored one dict per page
+        for page_info in data.get('page_order', []):
+            page_order.append(page_info['file'], page_info['index'], page_info.get('note', ''),
+                              page_info.get('marked', False), page_info.get('annotations', []))
+        return data.get('pdf_files', []), page_order
+    files = data['files']
+    for file_id, index, note, marked, annotations in data['pages']:
+        page_order.append(files[file_id], index, note, marked, annotations)
+    return files, page_order
+
+def _write_project(path, data):
+    """Save project data as MessagePack + Zstandard, or zipped JSON without those modules"""
+    import zipfile
+    msgpack, zstd = _optional("msgpack"), _optional("zstandard")
+    if msgpack is not None and zstd is not None:
+        # Single floats halve the size of ink strokes and are plenty for PDF coordinates
+        blob = zstd.ZstdCompressor(level=3).compress(msgpack.packb(data, use_single_float=True))
+        with open(path, 'wb') as f:
+            f.write(PROJECT_MAGIC)
+            f.write(blob)
+        return
+    # Repeated paths and notes compress very well, so store the JSON deflated
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        orjson = _optional("orjson")
+        if orjson is not None:
+            zf.writestr(PROJECT_ENTRY, orjson.dumps(data))
+            return
+        with zf.open(PROJECT_ENTRY, 'w') as entry:
+            with io.TextIOWrapper(entry, encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+
+def _json_loads(raw):
+    """Parse UTF-8 JSON bytes, with orjson when it is installed"""
+    orjson = _optional("orjson")
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def _read_project(path):
+    """Load project data saved in any of the .pmproj formats"""
+    import zipfile
+    with open(path, 'rb') as f:
+        magic = f.read(len(PROJECT_MAGIC))
+        if magic == PROJECT_MAGIC:
+            msgpack, zstd = _optional("msgpack"), _optional("zstandard")
+            if msgpack is None or zstd is None:
+                raise RuntimeError("This project needs the msgpack and zstandard packages.")
+            return msgpack.unpackb(zstd.ZstdDecompressor().decompress(f.read()))
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            return _json_loads(zf.read(PROJECT_ENTRY))
+    # Projects saved before compression are plain JSON
+    return _json_loads(Path(path).read_bytes())
+
+class PageThumbnail:
+    """One page row drawn as items on the shared thumbnail canvas
+
+    Rows have no bindings of their own: the app binds the shared "thumb" tag
+    once and finds the row from the event position.
+    """
+    def __init__(self, canvas, file_path, page_index, thumbnail_img):
+        self.canvas = canvas
         self.file_path = file_path
         self.page_index = page_index
-        self.on_click = on_click
-        self.on_drag_start = on_drag_start
         self.has_note = False
         self.is_marked = False
+        self.current_pos = None
 
-        # Configure layout for a horizontal "row-like" look in the vertical column
-        self.grid_columnconfigure(1, weight=1)
+        # All items of a row share one tag so they move and react together
+        self.tag = f"pt{id(self)}"
+        tags = ("thumb", self.tag)
+        # Filled with the canvas color so clicks between the image and text still hit the row
+        self.bg_item = canvas.create_rectangle(0, 0, 0, 0, fill=THUMB_BG, outline="", width=2, tags=tags)
+        self._last_fg = THUMB_BG
+        # Stands in for the thumbnail until it has been rendered
+        self.placeholder_item = canvas.create_rectangle(0, 0, 0, 0, fill="gray35", outline="", tags=tags)
+        self.img_item = canvas.create_image(0, 0, image=thumbnail_img or "", tags=tags)
+        self.text_item = canvas.create_text(0, 0, text=self._label(), anchor="w", justify="left",
+                                            fill="gray90", font=("Arial", 11), tags=tags)
+        self.image = None # Held here too, so a shown image outlives cache eviction
+        self.set_image(thumbnail_img)
 
-        # Thumbnail Image
-        self.img_label = ctk.CTkLabel(self, image=thumbnail_img, text="")
-        self.img_label.grid(row=0, column=0, padx=5, pady=5)
-        
-        # Details text (Filename and page)
-        filename = os.path.basename(file_path)
-        self.info_label = ctk.CTkLabel(self, text=f"{filename}\nPage {page_index + 1}", 
-                                      anchor="w", justify="left", font=("Arial", 11))
-        self.info_label.grid(row=0, column=1, padx=10, sticky="w")
-
-        # Bindings
-        self._bind_recursive(self, "<Button-1>", lambda e: self.on_click(self))
-        
-        # Drag bindings
-        self.img_label.bind("<B1-Motion>", self._on_drag)
-        self.bind("<B1-Motion>", self._on_drag)
+    def _label(self):
+        return f"{os.path.basename(self.file_path)}\nPage {self.page_index + 1}"
+
+    def place(self, pos):
+        """Move the row to position pos in the list"""
+        self.current_pos = pos
+        top = pos * ROW_HEIGHT
+        middle = top + ROW_HEIGHT // 2
+        self.canvas.coords(self.bg_item, 5, top + 2, ROW_WIDTH, top + ROW_HEIGHT - 2)
+        self.canvas.coords(self.placeholder_item, 10, middle - THUMB_SIZE[1] // 2,
+                           10 + THUMB_SIZE[0], middle + THUMB_SIZE[1] // 2)
+        self.canvas.coords(self.img_item, 10 + THUMB_SIZE[0] // 2, middle)
+        self.canvas.coords(self.text_item, THUMB_SIZE[0] + 25, middle)
+
+    def set_image(self, thumbnail_img, show_placeholder=True):
+        self.image = thumbnail_img
+        self.canvas.itemconfigure(self.img_item, image=thumbnail_img or "")
+        placeholder = thumbnail_img is None and show_placeholder
+        self.canvas.itemconfigure(self.placeholder_item, state="normal" if placeholder else "hidden")
+
+    def show_page(self, file_path, page_index, thumbnail_img):
+        """Reuse this row for another page"""
+        self.file_path = file_path
+        self.page_index = page_index
+        self.canvas.itemconfigure(self.text_item, text=self._label())
+        self.canvas.itemconfigure(self.tag, state="normal")
+        self.set_image(thumbnail_img)
 
-    def _bind_recursive(self, widget, event, callback):
-        widget.bind(event, callback)
-        for child in widget.winfo_children():
-            self._bind_recursive(child, event, callback)
+    def hide(self):
+        self.canvas.itemconfigure(self.tag, state="hidden")
+        # Pooled rows must not keep evicted images alive, nor show their placeholder
+        self.set_image(None, show_placeholder=False)
+        self.set_selected(False)
 
-    def _on_drag(self, event):
-        self.on_drag_start(self, event)
+    def set_selected(self, selected):
+        self.canvas.itemconfigure(self.bg_item, outline="#3b8ed0" if selected else "")
 
     def set_status(self, has_note, is_marked):
         self.has_note = has_note
         self.is_marked = is_marked
-        color = "transparent"
+        color = THUMB_BG
         if is_marked:
             color = "#ffcc00" # Golden/Marked
         elif has_note:
             color = "#4CAF50" # Green/Note
         
-        self.configure(fg_color=color)
+        if color == self._last_fg:
+            return # Skip the canvas redraw when nothing visible changes
+        self._last_fg = color
+        self.canvas.itemconfigure(self.bg_item, fill=color)
 
 class PDFMergerApp:
     def __init__(self, root):
@@ -84,21 +764,57 @@ class PDFMergerApp:
         self.root.geometry("1000x700")
 
         self.pdf_files = [] # List of unique file paths
-        self.page_order = [] # List of dicts: {'file': path, 'index': idx, 'note': '', 'marked': False}
-        self.thumbnails = {} # Cache for thumbnails: (path, idx) -> CTkImage
+        self._pdf_files_set = set() # Normalized pdf_files for O(1) duplicate checks
+        self._file_mtimes = {} # path -> st_mtime_ns seen when the file was added (disk cache key)
+        self.page_order = PageList()
+        self.thumbnails = OrderedDict() # LRU cache for thumbnails: (path, idx) -> PhotoImage, least recently used first
+        self._thumb_bytes = 0 # Approximate memory held by self.thumbnails
+        self.previews = OrderedDict() # LRU cache for previews: (path, idx) -> (PhotoImage, zoom, offset_x, offset_y)
+        self._thumb_lock = threading.Lock() # Guards self.thumbnails
+        self._preview_matrices = {} # Preview render Matrix by page size
+        self._selections = 0 # Page selections, counted for the periodic MuPDF store trim
+        self._executor = None # Created on first use
+        self._cache_writer = ThreadPoolExecutor(max_workers=1) # Encodes previews to the disk cache
+        self._use_process_pool = USE_PROCESS_POOL
+        self._thumb_widgets = [] # PageThumbnail per page_order entry
+        self._thumb_pool = [] # Hidden PageThumbnails ready for reuse
+        self._imaged_rows = set() # Rows given an image near the viewport, culled when scrolled away
+        self._requested_thumbs = set() # Keys already cached or submitted for rendering
+        self._thumb_results = queue.Queue() # Finished render futures, handed over by pool threads
+        self._pending_batches = 0 # Submitted render batches not yet collected
+        self._poll_id = None # Pending after for _poll_thumbnail_results
+        self._export_thread = None # Running export, so closing can't cut its save short
+        self._export_results = queue.Queue() # Progress and outcome posted by the export thread
+        self._visible_render_id = None # Pending after_idle for _render_visible_thumbnails
+        self._note_after_id = None # Pending debounced _flush_note
+        self._note_target = None # PageThumbnail the pending note text belongs to
         self.selected_thumbnail = None
+        self._pressed_row = None # Row under the last click on the page list, dragged on motion
         self.temp_dirs = [] # Track temp dirs for cleanup
+        self._doc_cache = OrderedDict() # path -> open fitz.Document, least recently used first
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         self.create_widgets()
 
     def on_closing(self):
         """Cleanup and close"""
+        if self._export_thread is not None and self._export_thread.is_alive():
+            # Exiting would kill the export thread, possibly in the middle of saving
+            messagebox.showwarning("Export Running", "Please wait for the export to finish before closing.")
+            return
+        if self._executor:
+            # Wait for running batches so the workers' documents can be closed. Workers never
+            # call into Tk (see _on_thumbnail_batch_done), so this can't wait on the UI thread
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self._cache_writer.shutdown(wait=True) # Finish pending writes before pruning
+        # Close cached documents first; open files would block removing the temp dirs on Windows
+        self._close_docs()
         for temp_dir in self.temp_dirs:
             try:
                 shutil.rmtree(temp_dir)
             except:
                 pass
+        _prune_thumb_cache()
         self.root.destroy()
 
     def create_widgets(self):
@@ -109,7 +825,7 @@ class PDFMergerApp:
         # Sidebar
         self.sidebar = ctk.CTkFrame(self.root, width=200, corner_radius=0)
         self.sidebar.grid(row=0, column=0, sticky="nsew")
-        self.sidebar.grid_rowconfigure(8, weight=1)
+        self.sidebar.grid_rowconfigure(9, weight=1)
 
         self.logo_label = ctk.CTkLabel(self.sidebar, text="PDF MERGER", font=ctk.CTkFont(size=20, weight="bold"))
         self.logo_label.grid(row=0, column=0, padx=20, pady=(20, 10))
@@ -141,27 +857,40 @@ class PDFMergerApp:
         self.export_btn = ctk.CTkButton(self.sidebar, text="Export Merged PDF", fg_color="#28a745", hover_color="#218838", command=self.export_pdf)
         self.export_btn.grid(row=7, column=0, padx=20, pady=20)
 
+        # Shown only while an export is running
+        self.export_progress = ctk.CTkProgressBar(self.sidebar, width=160)
+        self.export_progress.set(0)
+        self.export_progress.grid(row=8, column=0, padx=20, pady=(0, 10))
+        self.export_progress.grid_remove()
+
         # Main Content area (Scrollable Thumbnail Grid)
         self.main_frame = ctk.CTkFrame(self.root)
         self.main_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
         self.main_frame.grid_columnconfigure(0, weight=1)
-        self.main_frame.grid_rowconfigure(0, weight=1)
+        self.main_frame.grid_rowconfigure(1, weight=1)
 
-        self.scroll_frame = ctk.CTkScrollableFrame(self.main_frame, label_text="Pages (Select and use arrows to reorder)")
-        self.scroll_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
-        
-        # Registration for drag and drop (files)
-        self.scroll_frame._parent_canvas.drop_target_register(DND_FILES)
-        self.scroll_frame._parent_canvas.dnd_bind('<<Drop>>', self.on_file_drop)
+        self.pages_label = ctk.CTkLabel(self.main_frame, text="Pages (Select and use arrows to reorder)")
+        self.pages_label.grid(row=0, column=0, columnspan=2, pady=(5, 0))
 
-        # Detail Panel (Right Side)
-        self.detail_panel = ctk.CTkFrame(self.root, width=250)
-        self.detail_panel.grid(row=0, column=2, padx=10, pady=10, sticky="nsew")
+        # All page rows are drawn on one canvas; thousands of CTk widgets made scrolling crawl
+        self.page_canvas = tk.Canvas(self.main_frame, bg=THUMB_BG, highlightthickness=0,
+                                     yscrollincrement=ROW_HEIGHT // 4)
+        self.page_canvas.grid(row=1, column=0, sticky="nsew", padx=(5, 0), pady=5)
+        self.page_scrollbar = ctk.CTkScrollbar(self.main_frame, command=self.on_page_scrollbar)
+        self.page_scrollbar.grid(row=1, column=1, sticky="ns", padx=(0, 5), pady=5)
+        self.page_canvas.configure(yscrollcommand=self.page_scrollbar.set)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.page_canvas.bind(sequence, self.on_page_scroll)
+        self.page_canvas.bind("<Configure>", self._schedule_visible_render)
+        # One binding for all rows instead of one per row
+        self.page_canvas.tag_bind("thumb", "<Button-1>", self.on_row_press)
+        self.page_canvas.tag_bind("thumb", "<B1-Motion>", self.on_row_motion)
         
-        self.detail_label = ctk.CTkLabel(self.detail_panel, text="Page Details", font=ctk.CTkFont(weight="bold"))
-        self.detail_label.pack(pady=10)
+        # Registration for drag and drop (files)
+        self.page_canvas.drop_target_register(DND_FILES)
+        self.page_canvas.dnd_bind('<<Drop>>', self.on_file_drop)
 
-        # Detail Panel (Right Side - Now Annotation Area)
+        # Detail Panel (Right Side - Annotation Area)
         self.detail_panel = ctk.CTkFrame(self.root)
         self.detail_panel.grid(row=0, column=2, padx=10, pady=10, sticky="nsew")
         
@@ -202,9 +931,11 @@ class PDFMergerApp:
 
         # Annotation State
         self.ann_mode = "pen" # "pen" or "text"
-        self.current_draw_path = []
+        self.current_draw_path = None # StrokeBuffer while a pen stroke is drawn
         self.last_x, self.last_y = None, None
         self.active_image = None # Reference to keep current canvas image in memory
+        self.annotated_image = None # active_image with the page's annotations drawn in, if any
+        self.preview_item = None # Canvas image item showing the preview
 
     def add_files(self):
         files = filedialog.askopenfilenames(filetypes=[
@@ -223,19 +954,38 @@ class PDFMergerApp:
     def process_files(self, files):
         for f in files:
             f = f.strip('{}')
-            if not os.path.isfile(f):
+            ext = f.lower()[-4:]
+            if ext not in ('.pdf', '.4ss'):
+                continue
+            # One stat per file: checks it is a regular file and records its mtime
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
                 continue
                 
-            if f.lower().endswith('.pdf'):
-                if f not in self.pdf_files:
-                    self.pdf_files.append(f)
-                    self.load_pdf_pages(f)
-            elif f.lower().endswith('.4ss'):
+            if ext == '.pdf':
+                self.add_pdf(f, st.st_mtime_ns)
+            else:
                 self.handle_4ss(f)
-        self.refresh_grid()
+        self.extend_grid()
+
+    def add_pdf(self, file_path, mtime_ns=None):
+        """Add a PDF and its pages unless it is already in the project"""
+        file_path = os.path.abspath(file_path)
+        key = os.path.normcase(file_path) # So ./a.pdf and /full/a.pdf dedupe
+        if key in self._pdf_files_set:
+            return
+        self._pdf_files_set.add(key)
+        self.pdf_files.append(file_path)
+        if mtime_ns is not None:
+            self._file_mtimes[file_path] = mtime_ns
+        self.load_pdf_pages(file_path)
 
     def handle_4ss(self, file_path):
         """Handle forScore setlist files (.4ss)"""
+        import zipfile
         try:
             if zipfile.is_zipfile(file_path):
                 # It's a bundle (ZIP)
@@ -253,10 +1003,7 @@ class PDFMergerApp:
                     # No XML? Just add all PDFs found in bundle
                     bundle_pdfs = list(Path(temp_dir).glob("**/*.pdf"))
                     for pdf in bundle_pdfs:
-                        pdf_str = str(pdf)
-                        if pdf_str not in self.pdf_files:
-                            self.pdf_files.append(pdf_str)
-                            self.load_pdf_pages(pdf_str)
+                        self.add_pdf(str(pdf))
             else:
                 # Assume it's a plain XML file
                 self.parse_forscore_xml(file_path, os.path.dirname(file_path))
@@ -266,6 +1013,7 @@ class PDFMergerApp:
 
     def parse_forscore_xml(self, xml_path, base_dir):
         """Parse forScore XML setlist and load referenced PDFs"""
+        import xml.etree.ElementTree as ET
         try:
             tree = ET.parse(xml_path)
             root = tree.getroot()
@@ -283,9 +1031,7 @@ class PDFMergerApp:
                         # Try to find the PDF in base_dir
                         full_path = os.path.join(base_dir, pdf_filename)
                         if os.path.isfile(full_path):
-                            if full_path not in self.pdf_files:
-                                self.pdf_files.append(full_path)
-                                self.load_pdf_pages(full_path)
+                            self.add_pdf(full_path)
                         else:
                             print(f"Referenced PDF not found: {full_path}")
                 elif item.tag == 'bookmark':
@@ -295,106 +1041,368 @@ class PDFMergerApp:
                     # In a more advanced version, we could crop to specific pages
                     if pdf_filename:
                         full_path = os.path.join(base_dir, pdf_filename)
-                        if os.path.isfile(full_path) and full_path not in self.pdf_files:
-                            self.pdf_files.append(full_path)
-                            self.load_pdf_pages(full_path)
+                        if os.path.isfile(full_path):
+                            self.add_pdf(full_path)
 
         except Exception as e:
             raise Exception(f"Error parsing XML: {e}")
 
+    def _get_doc(self, path):
+        """Return an open document for path, reusing a cached handle (main thread only)"""
+        doc = self._doc_cache.get(path)
+        if doc is not None:
+            self._doc_cache.move_to_end(path)
+            return doc
+        import fitz
+        with _MUPDF_LOCK:
+            doc = fitz.open(path)
+            self._doc_cache[path] = doc
+            if len(self._doc_cache) > MAX_OPEN_DOCS:
+                _, oldest = self._doc_cache.popitem(last=False)
+                oldest.close()
+        return doc
+
+    def _close_docs(self):
+        """Close the documents held by the UI thread and by the render workers"""
+        with _MUPDF_LOCK:
+            for doc in self._doc_cache.values():
+                doc.close()
+        self._doc_cache.clear()
+        _close_worker_docs()
+        if self._executor is not None and self._use_process_pool:
+            # Worker processes keep their own caches. Retire the pool so they exit
+            # and release their files; the next render starts a fresh one.
+            # Cancelled batches come back through the poll and are requested again.
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
     def load_pdf_pages(self, file_path):
         try:
-            doc = fitz.open(file_path)
-            for i in range(len(doc)):
-                self.page_order.append({
-                    'file': file_path,
-                    'index': i,
-                    'note': '',
-                    'marked': False,
-                    'annotations': [] # List of {'type': 'pen', 'points': []} or {'type': 'text', 'pos': (x,y), 'content': ''}
-                })
-            doc.close()
+            doc = self._get_doc(file_path)
+            with _MUPDF_LOCK:
+                page_count = len(doc)
+            for i in range(page_count):
+                self.page_order.append(file_path, i)
         except Exception as e:
             messagebox.showerror("Error", f"Could not load {file_path}:\n{e}")
 
-    def get_thumbnail(self, file_path, page_idx):
-        key = (file_path, page_idx)
-        if key in self.thumbnails:
-            return self.thumbnails[key]
-        
+    def _store_thumbnail(self, key, data):
+        """Build a PhotoImage from PPM/PNG bytes and cache it (main thread only)"""
         try:
-            doc = fitz.open(file_path)
-            page = doc[page_idx]
-            pix = page.get_pixmap(matrix=fitz.Matrix(0.2, 0.2)) # Smaller for thumbs
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=(80, 110))
-            self.thumbnails[key] = ctk_img
-            doc.close()
-            return ctk_img
-        except Exception:
+            photo = tk.PhotoImage(data=data)
+        except tk.TclError:
+            # Corrupt cache file: remove it and let the page be rendered again
+            file_path, page_idx = key
+            cache_path = _thumb_cache_path(file_path, page_idx, THUMB_SIZE, "png",
+                                           self._file_mtimes.get(file_path))
+            if cache_path is not None:
+                try:
+                    cache_path.unlink()
+                except OSError:
+                    pass
+            self._requested_thumbs.discard(key)
+            self._schedule_visible_render()
             return None
+        with self._thumb_lock:
+            old = self.thumbnails.pop(key, None)
+            if old is not None:
+                self._thumb_bytes -= _photo_bytes(old)
+            self.thumbnails[key] = photo
+            self._thumb_bytes += _photo_bytes(photo)
+        self.enforce_max_cache_bytes()
+        return photo
+
+    def _cached_thumbnail(self, key):
+        """Return the cached PhotoImage for key, or None, marking it recently used"""
+        with self._thumb_lock:
+            photo = self.thumbnails.get(key)
+            if photo is not None:
+                self.thumbnails.move_to_end(key)
+        return photo
+
+    def enforce_max_cache_bytes(self, max_bytes=MAX_THUMB_CACHE_BYTES):
+        """Evict the least recently used thumbnails until the cache fits in max_bytes and MAX_THUMBNAILS
+
+        Rows keep a reference to the image they show, so visible pages are not
+        blanked; an evicted page is simply rendered again when it is needed.
+        """
+        with self._thumb_lock:
+            while self.thumbnails and (self._thumb_bytes > max_bytes or len(self.thumbnails) > MAX_THUMBNAILS):
+                key, photo = self.thumbnails.popitem(last=False)
+                self._thumb_bytes -= _photo_bytes(photo)
+                self._requested_thumbs.discard(key)
+
+    def _clear_thumbnails(self):
+        with self._thumb_lock:
+            self.thumbnails.clear()
+            self._thumb_bytes = 0
+        self.previews.clear()
+        self._requested_thumbs.clear()
+
+    def _clear_page_details(self):
+        """Empty the note box and mark checkbox; call with no page selected"""
+        self.note_text.delete("1.0", tk.END)
+        self.note_text.edit_modified(False)
+        self.mark_var.set(False)
+
+    def _clear_preview(self):
+        """Empty the preview canvas and drop its images"""
+        self.canvas.delete("all")
+        self.active_image = self.annotated_image = None
+
+    def _get_executor(self):
+        """Return the render pool, created on first use and kept for the app's lifetime
+
+        Thread workers serialize on _MUPDF_LOCK while rasterizing; only worker
+        processes render pages in parallel.
+        """
+        if self._executor is None:
+            pool_cls = ProcessPoolExecutor if self._use_process_pool else ThreadPoolExecutor
+            self._executor = pool_cls(max_workers=os.cpu_count())
+        return self._executor
 
     def refresh_grid(self):
-        # Clear current grid
-        for widget in self.scroll_frame.winfo_children():
-            widget.destroy()
+        """Sync the grid with page_order, reconfiguring existing rows in place"""
+        self._flush_note()
+        if self.selected_thumbnail:
+            self.selected_thumbnail.set_selected(False)
+            self.selected_thumbnail = None
+
+        # Pages that still have a row keep it, including its image even if the
+        # cache has evicted it; the row is only moved when its position changed
+        pages = self.page_order
+        by_key = {}
+        for widget in self._thumb_widgets:
+            by_key.setdefault((widget.file_path, widget.page_index), []).append(widget)
+        rows = [None] * len(pages)
+        for i in range(len(pages)):
+            matches = by_key.get(pages.key(i))
+            if matches:
+                rows[i] = matches.pop()
+
+        # Rows that no longer match a page are reused for pages without one
+        for matches in by_key.values():
+            for widget in matches:
+                widget.hide()
+                self._imaged_rows.discard(widget)
+                self._thumb_pool.append(widget)
+        for i, widget in enumerate(rows):
+            thumb_img = self._cached_thumbnail(pages.key(i))
+            if widget is None:
+                rows[i] = self._make_row(i, thumb_img)
+                continue
+            if thumb_img is not None and thumb_img is not widget.image:
+                widget.set_image(thumb_img)
+            if widget.current_pos != i:
+                widget.place(i)
+            widget.set_status(bool(pages.notes[i]), pages.marked[i])
+        self._thumb_widgets = rows
+        self._update_scrollregion()
+        self._schedule_visible_render()
+
+    def extend_grid(self):
+        """Create rows for pages appended to page_order since the last update"""
+        start = len(self._thumb_widgets)
+
+        # Rows without a cached thumbnail show a placeholder until they scroll into view
+        for i in range(start, len(self.page_order)):
+            thumb_img = self._cached_thumbnail(self.page_order.key(i))
+            self._place_thumbnail(i, thumb_img)
+        self._update_scrollregion()
+        self._schedule_visible_render()
+
+    def _schedule_visible_render(self, event=None):
+        if self._visible_render_id is None:
+            self._visible_render_id = self.root.after_idle(self._render_visible_thumbnails)
+
+    def _render_visible_thumbnails(self):
+        """Request thumbnails for rows in or near the viewport, releasing those far from it"""
+        self._visible_render_id = None
+        first, last = self._rows_near_viewport(PREFETCH_SCREENS)
+
+        # Far-away rows show their placeholder again, so the cache can really free
+        # the images it evicts; they are looked up again when scrolled back
+        keep_first, keep_last = self._rows_near_viewport(CULL_SCREENS)
+        for widget in [w for w in self._imaged_rows if not keep_first <= w.current_pos < keep_last]:
+            widget.set_image(None)
+            self._imaged_rows.discard(widget)
+
+        missing = {}
+        for widget in self._thumb_widgets[first:last]:
+            if widget.image is None:
+                key = (widget.file_path, widget.page_index)
+                thumb_img = self._cached_thumbnail(key)
+                if thumb_img is not None:
+                    widget.set_image(thumb_img)
+            if widget.image is not None:
+                self._imaged_rows.add(widget)
+                continue
+            if key in self._requested_thumbs:
+                continue
+            self._requested_thumbs.add(key)
+            missing.setdefault(widget.file_path, []).append(widget.page_index)
+
+        if missing:
+            self._render_missing_thumbnails(missing)
+
+    def _rows_near_viewport(self, screens):
+        """Return the (first, last + 1) rows within screens viewport heights of the view"""
+        height = self.page_canvas.winfo_height()
+        top = self.page_canvas.canvasy(0) - screens * height
+        bottom = self.page_canvas.canvasy(height) + screens * height
+        first = max(0, int(top // ROW_HEIGHT))
+        last = min(len(self._thumb_widgets), int(bottom // ROW_HEIGHT) + 1)
+        return first, last
+
+    def _render_missing_thumbnails(self, missing):
+        """Render thumbnails off the UI thread in batches of pages from one file"""
+        for file_path, indices in missing.items():
+            for start in range(0, len(indices), THUMB_BATCH_SIZE):
+                self._submit_thumbnail_batch(file_path, indices[start:start + THUMB_BATCH_SIZE])
+
+    def _submit_thumbnail_batch(self, file_path, indices):
+        try:
+            future = self._get_executor().submit(_render_file_thumbnails, file_path, indices,
+                                                 self._file_mtimes.get(file_path))
+        except RuntimeError:
+            return # Pool already shut down while closing
+        self._pending_batches += 1
+        if self._poll_id is None:
+            self._poll_id = self.root.after(THUMB_POLL_MS, self._poll_thumbnail_results)
+        future.add_done_callback(lambda f: self._on_thumbnail_batch_done(f, file_path, indices))
+
+    def _on_thumbnail_batch_done(self, future, file_path, indices):
+        """Queue a finished batch for the Tk thread (called from a pool thread)
+
+        Only the queue is touched here: Tk calls from other threads wait on the
+        UI thread, which deadlocks while on_closing waits for the pool.
+        """
+        self._thumb_results.put((future, file_path, indices))
+
+    def _poll_thumbnail_results(self):
+        """Install finished batches; keeps polling while batches are pending (main thread)"""
+        self._poll_id = None
+        while True:
+            try:
+                future, file_path, indices = self._thumb_results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending_batches -= 1
+            if future.cancelled():
+                # Let the pages be requested again when they are next in view
+                self._requested_thumbs.difference_update((file_path, i) for i in indices)
+                continue
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._fall_back_to_threads(file_path, indices)
+            elif error is None:
+                self._install_thumbnails(future.result())
+        if self._pending_batches and self._poll_id is None:
+            self._poll_id = self.root.after(THUMB_POLL_MS, self._poll_thumbnail_results)
+
+    def _fall_back_to_threads(self, file_path, indices):
+        """Switch to a thread pool when worker processes can't run, then retry"""
+        if self._use_process_pool:
+            self._use_process_pool = False
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._submit_thumbnail_batch(file_path, indices)
+
+    def _install_thumbnails(self, rendered):
+        """Cache rendered thumbnails and show them on their rows (main thread)"""
+        installed = {}
+        for key, data in rendered.items():
+            photo = self._store_thumbnail(key, data)
+            if photo is not None:
+                installed[key] = photo
+
+        # Pages may have moved while rendering, so look them up by key. Rows
+        # outside the cull range would drop the image again, so only scan those in it
+        first, last = self._rows_near_viewport(CULL_SCREENS)
+        for widget in self._thumb_widgets[first:last]:
+            key = (widget.file_path, widget.page_index)
+            if key in installed:
+                widget.set_image(installed[key])
+                self._imaged_rows.add(widget)
 
-        # Vertical layout: one column
-        for i, page_info in enumerate(self.page_order):
-            thumb_img = self.get_thumbnail(page_info['file'], page_info['index'])
-            if not thumb_img: continue
+    def _place_thumbnail(self, i, thumb_img):
+        self._thumb_widgets.append(self._make_row(i, thumb_img))
 
+    def _make_row(self, i, thumb_img):
+        """Return a row showing page_order[i], taken from the pool when possible"""
+        pages = self.page_order
+        if self._thumb_pool:
+            frame = self._thumb_pool.pop()
+            frame.show_page(pages.files[i], pages.indices[i], thumb_img)
+        else:
             frame = PageThumbnail(
-                self.scroll_frame, 
-                page_info['file'], 
-                page_info['index'], 
-                thumb_img,
-                on_click=self.on_thumbnail_click,
-                on_drag_start=self.on_thumbnail_drag
+                self.page_canvas, 
+                pages.files[i], 
+                pages.indices[i], 
+                thumb_img
             )
-            frame.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
-            frame.set_status(bool(page_info['note']), page_info['marked'])
-            
-            # Store index in frame for reordering
-            frame.current_pos = i
+        frame.place(i)
+        frame.set_status(bool(pages.notes[i]), pages.marked[i])
+        return frame
+
+    def _regrid_rows(self, first, last):
+        """Move rows for page_order[first:last + 1] to their current positions"""
+        for i in range(first, last + 1):
+            self._thumb_widgets[i].place(i)
+        self._schedule_visible_render()
+
+    def _update_scrollregion(self):
+        self.page_canvas.configure(scrollregion=(0, 0, ROW_WIDTH, len(self._thumb_widgets) * ROW_HEIGHT))
+
+    def on_page_scroll(self, event):
+        if event.num == 4:
+            units = -1
+        elif event.num == 5:
+            units = 1
+        elif sys.platform == "darwin":
+            units = -event.delta
+        elif event.delta == 0:
+            return
+        else:
+            # Truncate toward zero so both directions scale alike; high-resolution
+            # wheels and touchpads send small deltas that still move one unit
+            units = int(-event.delta / 120) or (-1 if event.delta > 0 else 1)
+        self.page_canvas.yview_scroll(units, "units")
+        self._schedule_visible_render()
+
+    def on_page_scrollbar(self, *args):
+        self.page_canvas.yview(*args)
+        self._schedule_visible_render()
 
     def on_thumbnail_click(self, thumb_frame):
+        self._flush_note()
         if self.selected_thumbnail:
-            self.selected_thumbnail.configure(border_width=0)
+            self.selected_thumbnail.set_selected(False)
         
         self.selected_thumbnail = thumb_frame
-        thumb_frame.configure(border_width=2, border_color="#3b8ed0")
+        thumb_frame.set_selected(True)
+
+        # MuPDF caches objects of every page it has loaded; trim that now and then
+        self._selections += 1
+        if self._selections % STORE_SHRINK_INTERVAL == 0:
+            _shrink_mupdf_store()
         
         # Update detail panel
-        page_info = self.page_order[thumb_frame.current_pos]
+        pos = thumb_frame.current_pos
+        file_path, page_idx = self.page_order.key(pos)
         
         # Load larger preview and draw on canvas
         try:
-            doc = fitz.open(page_info['file'])
-            page = doc[page_info['index']]
-            
-            # Scale to fit canvas
-            zoom_x = self.canvas_width / page.rect.width
-            zoom_y = self.canvas_height / page.rect.height
-            zoom = min(zoom_x, zoom_y)
-            
-            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            self.active_image = ImageTk.PhotoImage(img) # Keep reference
+            # Keep a reference to the image; zoom and offsets are kept for coordinate translation
+            self.active_image, self.current_zoom, self.img_offset_x, self.img_offset_y = \
+                self.get_preview(file_path, page_idx)
             self.canvas.delete("all")
             # Center image
-            self.canvas.create_image(self.canvas_width//2, self.canvas_height//2, image=self.active_image, anchor="center")
-            
-            # Store zoom for coordinate translation
-            self.current_zoom = zoom
-            self.img_offset_x = (self.canvas_width - pix.width) // 2
-            self.img_offset_y = (self.canvas_height - pix.height) // 2
+            self.preview_item = self.canvas.create_image(self.canvas_width//2, self.canvas_height//2,
+                                                         image=self.active_image, anchor="center")
             
             # Render existing annotations
-            self.render_annotations(page_info['annotations'])
-            
-            doc.close()
+            self.render_annotations(self.page_order.annotations[pos])
         except Exception as e:
             self.canvas.delete("all")
             self.canvas.create_text(self.canvas_width//2, self.canvas_height//2, text=f"Error: {e}", fill="red")
@@ -402,26 +1410,70 @@ class PDFMergerApp:
         # Set note and mark
         self.note_text.edit_modified(False) # Reset before loading
         self.note_text.delete("1.0", tk.END)
-        self.note_text.insert("1.0", page_info['note'])
+        self.note_text.insert("1.0", self.page_order.notes[pos])
         self.note_text.edit_modified(False) # Reset after loading
-        self.mark_var.set(page_info['marked'])
+        self.mark_var.set(bool(self.page_order.marked[pos]))
+
+    def get_preview(self, file_path, page_idx):
+        """Return (PhotoImage, zoom, offset_x, offset_y) for a page's canvas-sized preview
+
+        A page shown before is served from memory without touching the PDF.
+        """
+        import fitz
+        key = (file_path, page_idx)
+        preview = self.previews.get(key)
+        if preview is not None:
+            self.previews.move_to_end(key)
+            return preview
+
+        with _MUPDF_LOCK:
+            page = self._get_doc(file_path)[page_idx]
+            # Scale to fit canvas; the canvas size is fixed, so pages of one size share a Matrix
+            rect = page.rect
+            matrix = self._preview_matrices.get((rect.width, rect.height))
+            if matrix is None:
+                zoom = min(self.canvas_width / rect.width, self.canvas_height / rect.height)
+                matrix = self._preview_matrices[(rect.width, rect.height)] = fitz.Matrix(zoom, zoom)
+            zoom = matrix.a
+
+            cache_path = _thumb_cache_path(file_path, page_idx, (self.canvas_width, self.canvas_height),
+                                           mtime_ns=self._file_mtimes.get(file_path))
+            img = _load_cached_image(cache_path)
+            if img is None:
+                pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB, alpha=False)
+                # Copy the pixels out so the pixmap is released before the lock is
+                img = _rgb_image(pix.width, pix.height, pix.samples_mv).copy()
+                # The copy owns its pixels, so WebP can encode it off the UI thread
+                self._cache_writer.submit(_save_cached_image, img.copy(), cache_path)
+            page = pix = None
+
+        photo = ImageTk.PhotoImage(img)
+        # Tk now owns a copy of the pixels; release the PIL image right away
+        img.close()
+        img = None
+        preview = (photo, zoom,
+                   (self.canvas_width - photo.width()) // 2,
+                   (self.canvas_height - photo.height()) // 2)
+        self.previews[key] = preview
+        if len(self.previews) > MAX_PREVIEWS:
+            self.previews.popitem(last=False)
+        return preview
 
     def render_annotations(self, annotations):
-        for ann in annotations:
-            if ann['type'] == 'pen':
-                points = ann['points']
-                if len(points) > 1:
-                    # Translate back to canvas coordinates
-                    c_points = []
-                    for x, y in points:
-                        c_points.append(x * self.current_zoom + self.img_offset_x)
-                        c_points.append(y * self.current_zoom + self.img_offset_y)
-                    self.canvas.create_line(c_points, fill="blue", width=2, capstyle=tk.ROUND, smooth=True)
-            elif ann['type'] == 'text':
-                x, y = ann['pos']
-                cx = x * self.current_zoom + self.img_offset_x
-                cy = y * self.current_zoom + self.img_offset_y
-                self.canvas.create_text(cx, cy, text=ann['content'], fill="red", font=("Arial", 14, "bold"))
+        """Show the preview with annotations drawn in, as a single canvas image
+
+        Annotations are composited onto a copy of the cached preview, so the
+        canvas holds one item however many strokes the page has.
+        """
+        if annotations:
+            img = ImageTk.getimage(self.active_image) # RGBA copy; the cached preview stays clean
+            _draw_annotations(img, annotations, self.current_zoom)
+            self.annotated_image = ImageTk.PhotoImage(img)
+            img.close()
+        else:
+            self.annotated_image = None
+        self.canvas.itemconfigure(self.preview_item, image=self.annotated_image or self.active_image)
+        self.canvas.delete("stroke") # Live segments of the stroke just composited
     
     def set_pen_mode(self):
         self.ann_mode = "pen"
@@ -437,7 +1489,7 @@ class PDFMergerApp:
         if not self.selected_thumbnail: return
         idx = self.selected_thumbnail.current_pos
         if messagebox.askyesno("Clear", "Clear all drawings on this page?"):
-            self.page_order[idx]['annotations'] = []
+            self.page_order.annotations[idx] = []
             self.on_thumbnail_click(self.selected_thumbnail) # Refresh
 
     def on_canvas_click(self, event):
@@ -449,29 +1501,42 @@ class PDFMergerApp:
         
         if self.ann_mode == "pen":
             self.last_x, self.last_y = event.x, event.y
-            self.current_draw_path = [(pdf_x, pdf_y)]
+            self.current_draw_path = StrokeBuffer()
+            self.current_draw_path.append(pdf_x, pdf_y)
         elif self.ann_mode == "text":
             self.add_text_annotation(event.x, event.y, pdf_x, pdf_y)
 
     def on_canvas_drag(self, event):
         if self.ann_mode == "pen" and self.last_x is not None:
+            # Tk reports motion every pixel or so; near-duplicate points only bloat the stroke
+            dx, dy = event.x - self.last_x, event.y - self.last_y
+            if dx * dx + dy * dy < STROKE_MIN_STEP_PX * STROKE_MIN_STEP_PX:
+                return
+            # Drawn live on the canvas until the release composites the stroke
             self.canvas.create_line(self.last_x, self.last_y, event.x, event.y, 
-                                    fill="blue", width=2, capstyle=tk.ROUND, smooth=True)
+                                    fill="blue", width=2, capstyle=tk.ROUND, smooth=True, tags="stroke")
             self.last_x, self.last_y = event.x, event.y
             
             pdf_x = (event.x - self.img_offset_x) / self.current_zoom
             pdf_y = (event.y - self.img_offset_y) / self.current_zoom
-            self.current_draw_path.append((pdf_x, pdf_y))
+            self.current_draw_path.append(pdf_x, pdf_y)
 
     def on_canvas_release(self, event):
         if self.ann_mode == "pen" and self.current_draw_path:
+            if (event.x, event.y) != (self.last_x, self.last_y):
+                # End the stroke where the button was released, even if that motion was skipped
+                self.current_draw_path.append((event.x - self.img_offset_x) / self.current_zoom,
+                                              (event.y - self.img_offset_y) / self.current_zoom)
             idx = self.selected_thumbnail.current_pos
-            self.page_order[idx]['annotations'].append({
+            self.page_order.annotations[idx].append({
                 'type': 'pen',
-                'points': self.current_draw_path
+                # Stored as plain lists: projects are saved as JSON or MessagePack
+                'points': _simplify_stroke(self.current_draw_path.points(),
+                                           STROKE_TOLERANCE_PX / self.current_zoom)
             })
-            self.current_draw_path = []
+            self.current_draw_path = None
             self.last_x, self.last_y = None, None
+            self.render_annotations(self.page_order.annotations[idx])
 
     def add_text_annotation(self, cx, cy, px, py):
         # Create a simple entry popup
@@ -487,7 +1552,7 @@ class PDFMergerApp:
             text = entry.get()
             if text:
                 idx = self.selected_thumbnail.current_pos
-                self.page_order[idx]['annotations'].append({
+                self.page_order.annotations[idx].append({
                     'type': 'text',
                     'pos': (px, py),
                     'content': text
@@ -501,42 +1566,71 @@ class PDFMergerApp:
     def on_note_change(self, event=None):
         if not self.note_text.edit_modified():
             return
+        self.note_text.edit_modified(False) # Re-arm <<Modified>> for the next keystroke
             
         if self.selected_thumbnail:
-            idx = self.selected_thumbnail.current_pos
-            note = self.note_text.get("1.0", tk.END).strip()
-            self.page_order[idx]['note'] = note
-            self.selected_thumbnail.set_status(bool(note), self.page_order[idx]['marked'])
-        
-        self.note_text.edit_modified(False)
+            if self._note_after_id:
+                self.root.after_cancel(self._note_after_id)
+            self._note_target = self.selected_thumbnail
+            self._note_after_id = self.root.after(NOTE_DEBOUNCE_MS, self._flush_note)
+
+    def _flush_note(self):
+        """Store pending note text on the page it was typed for"""
+        if self._note_after_id is None:
+            return
+        self.root.after_cancel(self._note_after_id)
+        self._note_after_id = None
+        thumb, self._note_target = self._note_target, None
+
+        pos = thumb.current_pos
+        pages = self.page_order
+        had_note = bool(pages.notes[pos])
+        pages.notes[pos] = self.note_text.get("1.0", tk.END).strip()
+        # Only recolor the row when the note appears or disappears
+        if bool(pages.notes[pos]) != had_note:
+            thumb.set_status(bool(pages.notes[pos]), pages.marked[pos])
 
     def on_mark_toggle(self):
         if self.selected_thumbnail:
             idx = self.selected_thumbnail.current_pos
             marked = self.mark_var.get()
-            self.page_order[idx]['marked'] = marked
-            self.selected_thumbnail.set_status(bool(self.page_order[idx]['note']), marked)
+            self.page_order.marked[idx] = 1 if marked else 0
+            self.selected_thumbnail.set_status(bool(self.page_order.notes[idx]), marked)
+
+    def _row_at(self, event):
+        """Return the row under the cursor, or None"""
+        pos = int(self.page_canvas.canvasy(event.y) // ROW_HEIGHT)
+        if 0 <= pos < len(self._thumb_widgets):
+            return self._thumb_widgets[pos]
+        return None
+
+    def on_row_press(self, event):
+        # Remembered so the drag keeps moving this row wherever the cursor goes
+        self._pressed_row = self._row_at(event)
+        if self._pressed_row:
+            self.on_thumbnail_click(self._pressed_row)
+
+    def on_row_motion(self, event):
+        if self._pressed_row:
+            self.on_thumbnail_drag(self._pressed_row, event)
 
     def on_thumbnail_drag(self, thumb_frame, event):
-        # Calculate cursor position relative to the scroll_frame
-        y = event.y_root - self.scroll_frame.winfo_rooty()
+        # Cursor position in (scrolled) canvas coordinates
+        y = self.page_canvas.canvasy(event.y)
         
         # Determine the target index based on vertical position
-        # Each item is roughly 120px high (thumbnail + padding)
-        target_idx = max(0, min(len(self.page_order) - 1, y // 120))
+        target_idx = int(max(0, min(len(self.page_order) - 1, y // ROW_HEIGHT)))
         
         if target_idx != thumb_frame.current_pos:
-            # Reorder in data
+            # Reorder in data and widgets; only the rows in between shift
             old_idx = thumb_frame.current_pos
-            item = self.page_order.pop(old_idx)
-            self.page_order.insert(target_idx, item)
+            self.page_order.move(old_idx, target_idx)
+            self._thumb_widgets.insert(target_idx, self._thumb_widgets.pop(old_idx))
+            self._regrid_rows(min(old_idx, target_idx), max(old_idx, target_idx))
             
-            self.refresh_grid()
-            # Reselect to keep focus
-            for widget in self.scroll_frame.winfo_children():
-                if isinstance(widget, PageThumbnail) and widget.current_pos == target_idx:
-                    self.on_thumbnail_click(widget)
-                    break
+            # Keep focus on the dragged page
+            if self.selected_thumbnail is not thumb_frame:
+                self.on_thumbnail_click(thumb_frame)
 
     def move_page(self, direction):
         if not self.selected_thumbnail:
@@ -546,47 +1640,66 @@ class PDFMergerApp:
         new_idx = idx + direction
         
         if 0 <= new_idx < len(self.page_order):
-            # Swap in data
-            self.page_order[idx], self.page_order[new_idx] = self.page_order[new_idx], self.page_order[idx]
-            self.refresh_grid()
-            # Reselect the moved thumbnail
-            for widget in self.scroll_frame.winfo_children():
-                if isinstance(widget, PageThumbnail) and widget.current_pos == new_idx:
-                    self.on_thumbnail_click(widget)
-                    break
+            # Swap in data and just re-grid the two affected widgets; selection is unchanged
+            self.page_order.swap(idx, new_idx)
+            widgets = self._thumb_widgets
+            widgets[idx], widgets[new_idx] = widgets[new_idx], widgets[idx]
+            self._regrid_rows(min(idx, new_idx), max(idx, new_idx))
 
     def clear_all(self):
+        # Store a pending note while its page still exists
+        self._flush_note()
         if messagebox.askyesno("Clear All", "Are you sure you want to clear all files?"):
             self.pdf_files.clear()
+            self._pdf_files_set.clear()
+            self._file_mtimes.clear()
             self.page_order.clear()
-            self.thumbnails.clear()
-            self.refresh_grid()
-            self.preview_label.configure(image=None, text="Select a page")
-            self.note_text.delete("1.0", tk.END)
+            self._clear_thumbnails()
+            self._close_docs()
+            self.page_canvas.delete("all")
+            self._thumb_widgets = []
+            self._thumb_pool = []
+            self._imaged_rows.clear()
+            self._update_scrollregion()
+            self.selected_thumbnail = None
+            self._clear_preview()
+            self._clear_page_details()
+            # Images and pixmaps of the old session are garbage now; return the memory
+            gc.collect()
+            _shrink_mupdf_store()
 
     def save_project(self):
         path = filedialog.asksaveasfilename(defaultextension=".pmproj", filetypes=[("PDF Project", "*.pmproj")])
         if path:
-            data = {
-                'pdf_files': self.pdf_files,
-                'page_order': self.page_order
-            }
-            with open(path, 'w') as f:
-                json.dump(data, f)
+            self._flush_note()
+            _write_project(path, _encode_project(self.pdf_files, self.page_order))
             messagebox.showinfo("Success", "Project saved successfully.")
 
     def load_project(self):
+        # A pending note belongs to the current project; store it before page_order is replaced
+        self._flush_note()
         path = filedialog.askopenfilename(filetypes=[("PDF Project", "*.pmproj")])
         if path:
-            with open(path, 'r') as f:
-                data = json.load(f)
-            self.pdf_files = data.get('pdf_files', [])
-            self.page_order = data.get('page_order', [])
-            self.thumbnails.clear()
+            try:
+                pdf_files, page_order = _decode_project(_read_project(path))
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not load project:\n{e}")
+                return
+            self.pdf_files = pdf_files
+            self._pdf_files_set = {os.path.normcase(os.path.abspath(f)) for f in self.pdf_files}
+            self._file_mtimes = {} # Workers stat the files themselves
+            self.page_order = page_order
+            self._clear_thumbnails()
+            self._close_docs() # The previous project's files are no longer needed
+            self._clear_preview()
             self.refresh_grid()
+            self._clear_page_details() # refresh_grid deselected, so this can't store a note
+            gc.collect()
+            _shrink_mupdf_store()
             messagebox.showinfo("Success", "Project loaded successfully.")
 
     def export_pdf(self):
+        self._flush_note()
         if not self.page_order:
             messagebox.showwarning("No Pages", "No pages to export.")
             return
@@ -595,40 +1708,112 @@ class PDFMergerApp:
         if not save_path:
             return
 
+        # Snapshot the pages so edits made during the export don't race the worker
+        pages = self.page_order.copy()
+
+        self.export_btn.configure(state="disabled")
+        self.export_progress.set(0)
+        self.export_progress.grid()
+        self._export_thread = threading.Thread(target=self._do_export, args=(pages, save_path), daemon=True)
+        self._export_thread.start()
+        self.root.after(EXPORT_POLL_MS, self._poll_export)
+
+    def _do_export(self, pages, save_path):
+        """Build and save the merged PDF (runs in a worker thread)
+
+        Progress and the outcome go to _export_results; this thread never calls Tk.
+        """
+        import fitz
+        # The document cache belongs to the UI thread, so open sources locally
+        src_docs = {}
+        out_doc = None
+        tmp_path = None
+        error = None
         try:
-            out_doc = fitz.open()
-            for page_info in self.page_order:
-                src_doc = fitz.open(page_info['file'])
-                # Create a temporary single-page doc to apply annotations
-                temp_page_doc = fitz.open()
-                temp_page_doc.insert_pdf(src_doc, from_page=page_info['index'], to_page=page_info['index'])
-                page = temp_page_doc[0]
-                
-                # Apply annotations
-                ink_list = []
-                for ann in page_info['annotations']:
-                    if ann['type'] == 'pen':
-                        ink_list.append(ann['points'])
-                    elif ann['type'] == 'text':
-                        page.insert_text(ann['pos'], ann['content'], color=(1, 0, 0), fontsize=14)
-                
-                if ink_list:
-                    page.add_ink_annot(ink_list)
-                
-                # Merge into final doc
-                out_doc.insert_pdf(temp_page_doc)
-                
-                # Cleanup
-                src_doc.close()
-                temp_page_doc.close()
+            runs = pages.runs()
+            annotated = [i for i, anns in enumerate(pages.annotations) if anns]
+            total = len(runs) + len(annotated)
+            done = 0
 
-            out_doc.save(save_path)
-            out_doc.close()
-            messagebox.showinfo("Success", f"Merged PDF saved to:\n{save_path}")
+            # Hold the MuPDF lock per step, so thumbnails and previews still get turns
+            with _MUPDF_LOCK:
+                out_doc = fitz.open()
+            # Copy each contiguous run of source pages with a single insert
+            for file_path, first, last in runs:
+                with _MUPDF_LOCK:
+                    if file_path not in src_docs:
+                        src_docs[file_path] = fitz.open(file_path)
+                    out_doc.insert_pdf(src_docs[file_path], from_page=first, to_page=last)
+                done += 1
+                self._post_export_progress(done, total)
+
+            # Output pages line up with page_order, so annotate them in place
+            for out_idx in annotated:
+                with _MUPDF_LOCK:
+                    _apply_annotations(out_doc[out_idx], pages.annotations[out_idx])
+                done += 1
+                self._post_export_progress(done, total)
+
+            # Save next to the target and move it into place, so a failed save
+            # never leaves a truncated PDF at the chosen path
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(save_path)), suffix=".tmp")
+            os.close(fd)
+            with _MUPDF_LOCK:
+                out_doc.save(tmp_path)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to export PDF:\n{e}")
+            error = e
+        finally:
+            with _MUPDF_LOCK:
+                if out_doc is not None:
+                    out_doc.close()
+                for doc in src_docs.values():
+                    doc.close()
+
+        if error is None:
+            try:
+                # After closing the sources, in case the target is one of them
+                os.replace(tmp_path, save_path)
+            except OSError as e:
+                error = e
+        if error is not None:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            self._export_results.put(("done", "error", f"Failed to export PDF:\n{error}"))
+        else:
+            self._export_results.put(("done", "info", f"Merged PDF saved to:\n{save_path}"))
+
+    def _post_export_progress(self, done, total):
+        # Only post when the visible percentage changes to keep the queue small
+        if done == total or int(100 * done / total) != int(100 * (done - 1) / total):
+            self._export_results.put(("progress", done / total))
+
+    def _poll_export(self):
+        """Show export progress and the outcome posted by the export thread (main thread)"""
+        while True:
+            try:
+                item = self._export_results.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "progress":
+                self.export_progress.set(item[1])
+            else:
+                self._finish_export(item[1], item[2])
+                return
+        self.root.after(EXPORT_POLL_MS, self._poll_export)
+
+    def _finish_export(self, kind, message):
+        self.export_progress.grid_remove()
+        self.export_btn.configure(state="normal")
+        if kind == "error":
+            messagebox.showerror("Error", message)
+        else:
+            messagebox.showinfo("Success", message)
 
 def main():
+    multiprocessing.freeze_support() # Needed for USE_PROCESS_POOL in the bundled app
     root = TkinterDnD.Tk()
     app = PDFMergerApp(root)
     root.mainloop()